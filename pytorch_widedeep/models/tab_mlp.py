@@ -1,4 +1,5 @@
-import numpy as np
+from collections import OrderedDict
+
 import torch
 import torch.nn.functional as F
 from torch import nn
@@ -8,10 +9,77 @@ from pytorch_widedeep.wdtypes import *  # noqa: F403
 allowed_activations = ["relu", "leaky_relu", "gelu", "geglu"]
 
 
+# the 'approximate' argument was added to F.gelu in torch 1.12
+_torch_version = tuple(int(v) for v in torch.__version__.split(".")[:2])
+
+if _torch_version >= (1, 12):
+
+    def _gelu_tanh(x: Tensor) -> Tensor:
+        return F.gelu(x, approximate="tanh")
+
+else:
+
+    def _gelu_tanh(x: Tensor) -> Tensor:
+        # tanh approximation with sqrt(2 / pi) pre-computed
+        return (
+            0.5
+            * x
+            * (1.0 + torch.tanh(0.7978845608028654 * (x + 0.044715 * x * x * x)))
+        )
+
+
+def _geglu(x: Tensor) -> Tensor:
+    half = x.size(-1) // 2
+    a = x.narrow(-1, 0, half)
+    g = x.narrow(-1, half, half)
+    return a * _gelu_tanh(g)
+
+
+_scripted_geglu: Optional[Callable[[Tensor], Tensor]] = None
+
+
+def geglu(x: Tensor) -> Tensor:
+    # scripted so that the gelu and the product can be fused into one kernel.
+    # This happens on the first call rather than at import, since only the
+    # transformer-based models use geglu
+    global _scripted_geglu
+    if _scripted_geglu is None:
+        _scripted_geglu = torch.jit.script(_geglu)
+    return _scripted_geglu(x)
+
+
 class GEGLU(nn.Module):
     def forward(self, x):
-        x, gates = x.chunk(2, dim=-1)
-        return x * F.gelu(gates)
+        return geglu(x)
+
+
+if hasattr(torch, "_addmm_activation"):
+    _addmm_activation = torch._addmm_activation
+else:
+
+    def _addmm_activation(  # type: ignore[misc]
+        bias: Tensor, mat1: Tensor, mat2: Tensor
+    ) -> Tensor:
+        return F.relu(torch.addmm(bias, mat1, mat2))
+
+
+class LinearAct(nn.Linear):
+    r"""``nn.Linear`` followed by a relu activation. In inference (i.e. with
+    gradients disabled), and if the installed torch version supports it,
+    both are computed by ``torch._addmm_activation``, i.e. the activation
+    runs as the epilogue of the matrix multiplication instead of as a
+    separate kernel.
+
+    Only relu is fused: the gelu epilogue of ``_addmm_activation`` is the
+    tanh approximation on CUDA, while ``nn.GELU`` computes the exact gelu
+    """
+
+    def forward(self, X: Tensor) -> Tensor:
+        # '_addmm_activation' has no derivative, so it is only used when no
+        # graph is recorded (this also lets torch.compile trace the module)
+        if not torch.is_grad_enabled() and X.dim() == 2:
+            return _addmm_activation(self.bias, X, self.weight.t())
+        return F.relu(F.linear(X, self.weight, self.bias), inplace=True)
 
 
 def _get_activation_fn(activation):
@@ -39,11 +107,19 @@ def dense_layer(
             "'geglu' activation is only used as 'transformer_activation' "
             "in transformer-based models (TabTransformer and SAINT)"
         )
-    act_fn = _get_activation_fn(activation)
-    layers = [nn.BatchNorm1d(out if linear_first else inp)] if bn else []
+    layers: List[nn.Module] = (
+        [nn.BatchNorm1d(out if linear_first else inp)] if bn else []
+    )
     if p != 0:
-        layers.append(nn.Dropout(p))  # type: ignore[arg-type]
-    lin = [nn.Linear(inp, out, bias=not bn), act_fn]
+        # the dropout can run in place when it follows an op whose backward
+        # does not need that op's output, i.e. batchnorm or gelu (relu and
+        # leaky_relu do), but never on the input of the layer
+        inplace = bn or (linear_first and activation == "gelu")
+        layers.append(nn.Dropout(p, inplace=inplace))
+    if activation == "relu" and not bn:
+        lin: List[nn.Module] = [LinearAct(inp, out)]
+    else:
+        lin = [nn.Linear(inp, out, bias=not bn), _get_activation_fn(activation)]
     layers = lin + layers if linear_first else layers + lin
     return nn.Sequential(*layers)
 
@@ -60,24 +136,33 @@ class MLP(nn.Module):
     ):
         super(MLP, self).__init__()
 
+        n_layers = len(d_hidden) - 1
         if not dropout:
-            dropout = [0.0] * len(d_hidden)
+            dropout = [0.0] * n_layers
         elif isinstance(dropout, float):
-            dropout = [dropout] * len(d_hidden)
-
-        self.mlp = nn.Sequential()
-        for i in range(1, len(d_hidden)):
-            self.mlp.add_module(
-                "dense_layer_{}".format(i - 1),
-                dense_layer(
-                    d_hidden[i - 1],
-                    d_hidden[i],
-                    activation,
-                    dropout[i - 1],
-                    batchnorm and (i != len(d_hidden) - 1 or batchnorm_last),
-                    linear_first,
-                ),
+            dropout = [dropout] * n_layers
+        if len(dropout) != n_layers:
+            raise ValueError(
+                "The number of dropout values ({}) must be equal to the number "
+                "of dense layers ({})".format(len(dropout), n_layers)
+            )
+
+        self.mlp = nn.Sequential(
+            OrderedDict(
+                (
+                    "dense_layer_{}".format(i),
+                    dense_layer(
+                        d_hidden[i],
+                        d_hidden[i + 1],
+                        activation,
+                        dropout[i],
+                        batchnorm and (i != n_layers - 1 or batchnorm_last),
+                        linear_first,
+                    ),
+                )
+                for i in range(n_layers)
             )
+        )
 
     def forward(self, X: Tensor) -> Tensor:
         return self.mlp(X)
@@ -133,8 +218,16 @@ class TabMlp(nn.Module):
     tab_mlp: ``nn.Sequential``
         mlp model that will receive the concatenation of the embeddings and
         the continuous columns
-    embed_layers: ``nn.ModuleDict``
-        ``ModuleDict`` with the embeddings set up
+    embed_layers: ``nn.ModuleList``
+        ``ModuleList`` with one embedding table per distinct embedding
+        dimension. The embeddings of a given column can be retrieved via the
+        ``embed_matrix`` method
+    cat_idx: ``torch.LongTensor``
+        Index of the categorical columns in the order their embeddings are
+        passed to the MLP: grouped by embedding dimension (in order of first
+        appearance in ``embed_input``) and, within a group, in the
+        ``embed_input`` order. The continuous columns come after the
+        embeddings
     output_dim: int
         The output dimension of the model. This is a required attribute
         neccesary to build the WideDeep class
@@ -150,6 +243,16 @@ class TabMlp(nn.Module):
     >>> model = TabMlp(mlp_hidden_dims=[8,4], column_idx=column_idx, embed_input=embed_input,
     ... continuous_cols = ['e'])
     >>> out = model(X_tab)
+
+    .. note:: the layout of the embeddings and of the input of the MLP
+        changed when the per-column embeddings were fused. State dicts saved
+        with the previous layout (i.e. with ``embed_layers.emb_layer_<col>``
+        keys) are converted when loaded. A categorical value larger than the
+        number of unique values of its column raises an ``IndexError``, as
+        it would in a per-column ``nn.Embedding``. On CUDA the check is an
+        asynchronous device-side assert (``torch._assert_async``) so that it
+        does not synchronise the device on every forward pass, and the error
+        is reported by a later CUDA call
     """
 
     def __init__(
@@ -187,22 +290,29 @@ class TabMlp(nn.Module):
                 )
             )
 
-        # Embeddings: val + 1 because 0 is reserved for padding/unseen cateogories.
+        # Embeddings: columns with the same embedding dim share a single
+        # table, so the lookup costs one gather per distinct dim instead of
+        # one per column. Row 0 of each table is reserved for
+        # padding/unseen categories and each column gets val rows after an
+        # offset that is added to its indices at forward time
         if self.embed_input is not None:
-            self.embed_layers = nn.ModuleDict(
-                {
-                    "emb_layer_" + col: nn.Embedding(val + 1, dim, padding_idx=0)
-                    for col, val, dim in self.embed_input
-                }
-            )
-            self.embedding_dropout = nn.Dropout(embed_dropout)
-            emb_inp_dim = np.sum([embed[2] for embed in self.embed_input])
+            self._set_embed_layers()
+            self.same_embed_dim = len(self.embed_layers) == 1
+            emb_inp_dim = sum(self.embed_dims)
         else:
-            emb_inp_dim = 0  # type: ignore[assignment]
+            emb_inp_dim = 0
+            self.same_embed_dim = False
 
         # Continuous
         if self.continuous_cols is not None:
-            self.cont_idx = [self.column_idx[col] for col in self.continuous_cols]
+            self.register_buffer(
+                "cont_idx",
+                torch.tensor(
+                    [self.column_idx[col] for col in self.continuous_cols],
+                    dtype=torch.long,
+                ),
+                persistent=False,
+            )
             cont_inp_dim = len(self.continuous_cols)
             if self.cont_norm_layer == "batchnorm":
                 self.cont_norm: NormLayers = nn.BatchNorm1d(cont_inp_dim)
@@ -214,8 +324,9 @@ class TabMlp(nn.Module):
             cont_inp_dim = 0
 
         # MLP
-        input_dim = emb_inp_dim + cont_inp_dim
-        mlp_hidden_dims = [input_dim] + mlp_hidden_dims  # type: ignore[assignment, operator]
+        self.emb_inp_dim = emb_inp_dim
+        self.input_dim = emb_inp_dim + cont_inp_dim
+        mlp_hidden_dims = [self.input_dim] + mlp_hidden_dims  # type: ignore[assignment, operator]
         self.tab_mlp = MLP(
             mlp_hidden_dims,
             mlp_activation,
@@ -228,18 +339,377 @@ class TabMlp(nn.Module):
         # the output_dim attribute will be used as input_dim when "merging" the models
         self.output_dim = mlp_hidden_dims[-1]
 
+        # dtype of the embeddings and the mlp. See 'to_bf16_inference' and
+        # '_apply'
+        self.mlp_dtype = torch.float32
+
+        # compiled version of '_forward'. See 'compile_forward'
+        self._compiled_forward: Optional[Callable] = None
+
     def forward(self, X: Tensor) -> Tensor:  # type: ignore
         r"""Forward pass that concatenates the continuous features with the
         embeddings. The result is then passed through a series of dense layers
         """
+        x_cat = (
+            X.index_select(1, self.cat_idx).long()  # type: ignore[arg-type]
+            if self.embed_input is not None
+            else None
+        )
+        x_cont = (
+            X.index_select(1, self.cont_idx).float()  # type: ignore[arg-type]
+            if self.continuous_cols is not None
+            else None
+        )
+        self._check_cat_bounds(x_cat)
+        if self._compiled_forward is not None:
+            return self._compiled_forward(x_cat, x_cont)
+        return self._forward(x_cat, x_cont)
+
+    def forward_split(
+        self, X_cat: Optional[Tensor] = None, X_cont: Optional[Tensor] = None
+    ) -> Tensor:
+        r"""Same as ``forward`` but for inputs where the categorical and the
+        continuous columns are already split, which avoids slicing the input
+        and casting the categorical columns back to ``long``
+
+        Parameters
+        ----------
+        X_cat: Tensor, Optional, default = None
+            ``LongTensor`` with the categorical columns, in the same order
+            as in ``embed_input``
+        X_cont: Tensor, Optional, default = None
+            ``FloatTensor`` with the continuous columns, in the same order as
+            in ``continuous_cols``
+        """
+        if (X_cat is None) != (self.embed_input is None):
+            raise ValueError(
+                "'X_cat' must be passed if and only if the model has 'embed_input'"
+            )
+        if (X_cont is None) != (self.continuous_cols is None):
+            raise ValueError(
+                "'X_cont' must be passed if and only if the model has "
+                "'continuous_cols'"
+            )
+        if X_cat is not None and self.cat_order is not None:
+            X_cat = X_cat.index_select(1, self.cat_order)  # type: ignore[arg-type]
+        self._check_cat_bounds(X_cat)
+        if self._compiled_forward is not None:
+            return self._compiled_forward(X_cat, X_cont)
+        return self._forward(X_cat, X_cont)
+
+    def _check_cat_bounds(self, x_cat: Optional[Tensor]):
+        # all columns of a group share a table, so an out of range index
+        # would silently read the rows of the next column
+        if x_cat is None:
+            return
+        in_range = x_cat.le(self.cat_n_cat).logical_and_(x_cat.ge(0)).all()  # type: ignore[arg-type]
+        if x_cat.is_cuda and hasattr(torch, "_assert_async"):
+            torch._assert_async(in_range)
+        elif not in_range:
+            raise IndexError(
+                "The categorical columns contain values outside the range "
+                "[0, n_unique] given in 'embed_input'"
+            )
+
+    def _forward(self, x_cat: Optional[Tensor], x_cont: Optional[Tensor]) -> Tensor:
+        if x_cat is not None:
+            x_cat = (x_cat + self.cat_offsets).masked_fill(x_cat == 0, 0)  # type: ignore[operator]
+        if self.same_embed_dim and x_cont is None:
+            # a single table and no continuous cols: the output of the
+            # gather already is the mlp input
+            x = self._embed_dropout(self.embed_layers[0](x_cat).flatten(1))
+        elif x_cat is not None:
+            # the embeddings and the continuous features are written straight
+            # into the mlp input rather than concatenated
+            x = torch.empty(
+                x_cat.size(0), self.input_dim, dtype=self.mlp_dtype, device=x_cat.device
+            )
+            for embed_layer, x_cat_group, (start, end) in zip(
+                self.embed_layers,
+                x_cat.split(self.embed_group_sizes, 1),
+                self.embed_group_bounds,
+            ):
+                x[:, start:end] = self._embed_dropout(
+                    embed_layer(x_cat_group).flatten(1)
+                )
+        if x_cont is not None:
+            x_cont = self.cont_norm(x_cont)
+            if x_cat is not None:
+                x[:, self.emb_inp_dim :] = x_cont
+            else:
+                x = x_cont.to(self.mlp_dtype)
+        return self.tab_mlp(x).float()
+
+    def _embed_dropout(self, x: Tensor) -> Tensor:
+        # the output of the gather is not needed for the backward pass, so the
+        # dropout can run in place instead of allocating a new tensor
+        return F.dropout(x, p=self.embed_dropout, training=self.training, inplace=True)
+
+    def fuse_for_inference(self):
+        r"""Folds the ``BatchNorm1d`` layer applied to the continuous columns
+        into the first linear layer of the MLP, so that the normalisation
+        does not run as a separate kernel. Returns the model itself.
+
+        The model must be in ``eval`` mode and must not be trained after
+        this call. The folding only happens when ``cont_norm_layer =
+        'batchnorm'`` and, dropout aside, the first operation of the MLP is
+        the linear layer (i.e. ``mlp_linear_first = True`` or
+        ``mlp_batchnorm = False``). Otherwise the model is returned
+        unchanged. Note that a ``LayerNorm`` normalises each observation with
+        its own statistics and cannot be folded.
+        """
+        if self.training:
+            raise ValueError("'fuse_for_inference' can only be called in 'eval' mode")
+
+        cont_norm = getattr(self, "cont_norm", None)
+        if not isinstance(cont_norm, nn.BatchNorm1d) or cont_norm.running_mean is None:
+            return self
+
+        lin = None
+        for layer in self.tab_mlp.mlp.dense_layer_0:
+            if isinstance(layer, nn.Linear):
+                lin = layer
+                break
+            if not isinstance(layer, nn.Dropout):
+                return self
+
+        # BN(x) = x * scale + shift, hence:
+        # W @ BN(x) + b = (W * scale) @ x + (W @ shift + b)
+        with torch.no_grad():
+            scale = torch.rsqrt(cont_norm.running_var + cont_norm.eps)
+            if cont_norm.affine:
+                scale = scale * cont_norm.weight
+            shift = -cont_norm.running_mean * scale
+            if cont_norm.affine:
+                shift = shift + cont_norm.bias
+            scale, shift = scale.to(lin.weight.dtype), shift.to(lin.weight.dtype)
+            w_cont = lin.weight[:, self.emb_inp_dim :]
+            if lin.bias is None:
+                lin.bias = nn.Parameter(lin.weight.new_zeros(lin.out_features))
+            lin.bias += w_cont @ shift
+            w_cont *= scale
+        self.cont_norm = nn.Identity()
+
+        return self
+
+    def to_bf16_inference(self):
+        r"""Casts the embeddings and the MLP to ``bfloat16``, halving their
+        memory footprint and the memory traffic of the matrix
+        multiplications in inference. Returns the model itself.
+
+        The continuous normalisation layer is kept in float32 and its
+        output is cast when written into the MLP input. The output of the
+        model is cast back to float32, so that it can still be combined
+        with other float32 components (e.g. inside ``WideDeep``).
+        """
+        if self.embed_input is not None:
+            self.embed_layers.to(torch.bfloat16)
+        self.tab_mlp.to(torch.bfloat16)
+        self.mlp_dtype = torch.bfloat16
+        return self
+
+    def _apply(self, fn, *args, **kwargs):
+        # keeps 'mlp_dtype' in sync with casts of the whole model, e.g.
+        # model.float() after 'to_bf16_inference'
+        super(TabMlp, self)._apply(fn, *args, **kwargs)
+        self.mlp_dtype = next(self.tab_mlp.parameters()).dtype
+        return self
+
+    def script_mlp(self):
+        r"""Replaces the MLP with its TorchScript version, so that the
+        sequences of pointwise operations in the dense layers (bias,
+        activation, dropout, batchnorm) can be fused by the JIT fuser. Returns
+        the model itself.
+
+        .. note:: a ``TabMlp`` with a scripted MLP cannot be pickled, so the
+            model must be saved via its ``state_dict``
+        """
+        self.tab_mlp = torch.jit.script(self.tab_mlp)
+        return self
+
+    def compile_forward(
+        self, mode: Optional[str] = "max-autotune", fullgraph: bool = True, **kwargs
+    ):
+        r"""Compiles the forward pass (embeddings lookup, continuous
+        normalisation and MLP) with ``torch.compile``, specialised on the
+        shapes of the inputs (``dynamic = False``). Both ``forward`` and
+        ``forward_split`` run the compiled graph. Returns the model itself.
+
+        Since the batch size is normally fixed during a run, a single graph
+        is compiled for the observed shape and the MLP can be fused into a
+        few kernels. Any other batch size (e.g. the last batch of an epoch)
+        triggers a recompilation.
+
+        Parameters
+        ----------
+        mode: str, Optional, default = "max-autotune"
+            ``torch.compile`` mode
+        fullgraph: bool, default = True
+            Boolean indicating whether or not the whole forward pass must be
+            captured in a single graph
+        **kwargs:
+            any other ``torch.compile`` argument, e.g. ``backend``
+
+        .. note:: requires ``torch >= 2.0``. A ``TabMlp`` with a compiled
+            forward cannot be pickled, so the model must be saved via its
+            ``state_dict``
+        """
+        if not hasattr(torch, "compile"):
+            raise RuntimeError("'compile_forward' requires torch >= 2.0")
+        self._compiled_forward = torch.compile(
+            self._forward, dynamic=False, fullgraph=fullgraph, mode=mode, **kwargs
+        )
+        return self
+
+    def embed_matrix(self, col: str) -> Tensor:
+        r"""Returns the embeddings of column ``col``, with the same layout an
+        independent ``nn.Embedding(val + 1, dim, padding_idx=0)`` would have,
+        i.e. row 0 is the padding/unseen category and row ``i`` is the
+        embedding of the category encoded as ``i``
+        """
+        pos = self.embed_cols.index(col)
+        group = self.embed_group_idx[pos]
+        offset = self.embed_offsets[pos]
+        n_cat = self.embed_n_cat[pos]
+        weight = self.embed_layers[group].weight
+        return torch.cat([weight[:1], weight[offset + 1 : offset + n_cat + 1]])
+
+    def _load_from_state_dict(
+        self,
+        state_dict,
+        prefix,
+        local_metadata,
+        strict,
+        missing_keys,
+        unexpected_keys,
+        error_msgs,
+    ):
         if self.embed_input is not None:
-            embed = [
-                self.embed_layers["emb_layer_" + col](X[:, self.column_idx[col]].long())
-                for col, _, _ in self.embed_input
+            self._convert_legacy_state_dict(state_dict, prefix)
+        super(TabMlp, self)._load_from_state_dict(
+            state_dict,
+            prefix,
+            local_metadata,
+            strict,
+            missing_keys,
+            unexpected_keys,
+            error_msgs,
+        )
+
+    def _convert_legacy_state_dict(self, state_dict, prefix):
+        # state dicts saved before the embeddings were fused have one table
+        # per column, and the mlp input in 'embed_input' order. Here the
+        # tables are stacked into the group tables and the input of the
+        # first dense layer is permuted into the order given by 'cat_idx'
+        old_keys = [
+            prefix + "embed_layers.emb_layer_" + col + ".weight"
+            for col in self.embed_cols
+        ]
+        if not all(k in state_dict for k in old_keys):
+            return
+
+        for group, embed_layer in enumerate(self.embed_layers):
+            weight = torch.zeros_like(embed_layer.weight)
+            for pos, key in enumerate(old_keys):
+                if self.embed_group_idx[pos] == group:
+                    start = self.embed_offsets[pos] + 1
+                    weight[start : start + self.embed_n_cat[pos]] = state_dict[key][1:]
+            state_dict[prefix + "embed_layers.{}.weight".format(group)] = weight
+        for key in old_keys:
+            del state_dict[key]
+
+        old_starts = [0]
+        for dim in self.embed_dims[:-1]:
+            old_starts.append(old_starts[-1] + dim)
+        perm = [
+            j
+            for i in sorted(
+                range(len(self.embed_cols)), key=lambda i: self.embed_group_idx[i]
+            )
+            for j in range(old_starts[i], old_starts[i] + self.embed_dims[i])
+        ]
+        if perm == sorted(perm):
+            return
+        perm = torch.tensor(
+            perm + list(range(self.emb_inp_dim, self.input_dim)), dtype=torch.long
+        )
+        # the first dense layer is either [BN -> DP -> LIN -> ACT] or
+        # [LIN -> ACT -> BN -> DP]. Only the modules up to the linear layer
+        # see the mlp input
+        layer_prefix = prefix + "tab_mlp.mlp.dense_layer_0."
+        for name, module in self.tab_mlp.mlp.dense_layer_0.named_children():
+            for param in ("weight", "bias", "running_mean", "running_var"):
+                key = layer_prefix + name + "." + param
+                if key not in state_dict:
+                    continue
+                if isinstance(module, nn.Linear):
+                    if param == "weight":
+                        state_dict[key] = state_dict[key][:, perm]
+                else:
+                    state_dict[key] = state_dict[key][perm]
+            if isinstance(module, nn.Linear):
+                break
+
+    def _set_embed_layers(self):
+        # embed_input is unpacked column-wise once here, so that nothing
+        # iterates over its tuples after __init__
+        self.embed_cols = [col for col, _, _ in self.embed_input]
+        self.embed_n_cat = [val for _, val, _ in self.embed_input]
+        self.embed_dims = [dim for _, _, dim in self.embed_input]
+        dims = list(dict.fromkeys(self.embed_dims))
+        self.embed_group_idx = [dims.index(dim) for dim in self.embed_dims]
+
+        # the categorical columns are gathered grouped by embedding dim, so
+        # that each table reads a contiguous block of the input
+        cat_order = sorted(
+            range(len(self.embed_cols)), key=lambda i: self.embed_group_idx[i]
+        )
+        self.register_buffer(
+            "cat_idx",
+            torch.tensor(
+                [self.column_idx[self.embed_cols[i]] for i in cat_order],
+                dtype=torch.long,
+            ),
+            persistent=False,
+        )
+        # only needed to reorder inputs passed to forward_split
+        self.register_buffer(
+            "cat_order",
+            torch.tensor(cat_order, dtype=torch.long)
+            if cat_order != sorted(cat_order)
+            else None,
+            persistent=False,
+        )
+
+        group_sizes = [0] * len(dims)
+        group_rows = [0] * len(dims)
+        self.embed_offsets = [0] * len(self.embed_cols)
+        for i, (val, group) in enumerate(zip(self.embed_n_cat, self.embed_group_idx)):
+            group_sizes[group] += 1
+            self.embed_offsets[i] = group_rows[group]
+            group_rows[group] += val
+        self.embed_group_sizes = group_sizes
+        self.register_buffer(
+            "cat_offsets",
+            torch.tensor([self.embed_offsets[i] for i in cat_order], dtype=torch.long),
+            persistent=False,
+        )
+        self.register_buffer(
+            "cat_n_cat",
+            torch.tensor([self.embed_n_cat[i] for i in cat_order], dtype=torch.long),
+            persistent=False,
+        )
+
+        # start and end of the block of each group in the mlp input
+        self.embed_group_bounds = []
+        start = 0
+        for n, dim in zip(group_sizes, dims):
+            self.embed_group_bounds.append((start, start + n * dim))
+            start += n * dim
+
+        self.embed_layers = nn.ModuleList(
+            [
+                nn.Embedding(n_rows + 1, dim, padding_idx=0)
+                for n_rows, dim in zip(group_rows, dims)
             ]
-            x = torch.cat(embed, 1)
-            x = self.embedding_dropout(x)
-        if self.continuous_cols is not None:
-            x_cont = self.cont_norm((X[:, self.cont_idx].float()))
-            x = torch.cat([x, x_cont], 1) if self.embed_input is not None else x_cont
-        return self.tab_mlp(x)
+        )
@@ -1,6 +1,5 @@
 from collections import OrderedDict
 
-import numpy as np
 import torch
 from torch import nn
 from torch.nn import Module
@@ -230,12 +229,27 @@ class TabResnet(nn.Module):
                 for col, val, dim in self.embed_input
             }
         )
+        self.register_buffer(
+            "cat_idx",
+            torch.tensor(
+                [self.column_idx[col] for col, _, _ in self.embed_input],
+                dtype=torch.long,
+            ),
+            persistent=False,
+        )
         self.embedding_dropout = nn.Dropout(embed_dropout)
-        emb_inp_dim = np.sum([embed[2] for embed in self.embed_input])
+        emb_inp_dim = sum(embed[2] for embed in self.embed_input)
 
         # Continuous
         if self.continuous_cols is not None:
-            self.cont_idx = [self.column_idx[col] for col in self.continuous_cols]
+            self.register_buffer(
+                "cont_idx",
+                torch.tensor(
+                    [self.column_idx[col] for col in self.continuous_cols],
+                    dtype=torch.long,
+                ),
+                persistent=False,
+            )
             cont_inp_dim = len(self.continuous_cols)
             if self.cont_norm_layer == "batchnorm":
                 self.cont_norm: NormLayers = nn.BatchNorm1d(cont_inp_dim)
@@ -278,15 +292,18 @@ class TabResnet(nn.Module):
         r"""Forward pass that concatenates the continuous features with the
         embeddings. The result is then passed through a series of dense Resnet
         blocks"""
+        x_cat = X.index_select(1, self.cat_idx).long()  # type: ignore[arg-type]
         embed = [
-            self.embed_layers["emb_layer_" + col](X[:, self.column_idx[col]].long())
-            for col, _, _ in self.embed_input
+            emb_layer(x)
+            for emb_layer, x in zip(self.embed_layers.values(), x_cat.unbind(1))
         ]
         x = torch.cat(embed, 1)
         x = self.embedding_dropout(x)
 
         if self.continuous_cols is not None:
-            x_cont = self.cont_norm((X[:, self.cont_idx].float()))
+            x_cont = self.cont_norm(
+                X.index_select(1, self.cont_idx).float()  # type: ignore[arg-type]
+            )
             if self.concat_cont_first:
                 x = torch.cat([x, x_cont], 1)
                 out = self.tab_resnet_blks(x)
@@ -221,22 +221,23 @@ class TabTransformer(nn.Module):
 
     def forward(self, X: Tensor) -> Tensor:
 
+        x_cat = X.index_select(1, self.cat_idx).long()  # type: ignore[arg-type]
         if self.shared_embed:
             x_cat_embed = [
-                self.cat_embed["emb_layer_" + col](
-                    X[:, self.column_idx[col]].long()
-                ).unsqueeze(1)
-                for col, _ in self.embed_input
+                emb_layer(x).unsqueeze(1)
+                for emb_layer, x in zip(self.cat_embed.values(), x_cat.unbind(1))
             ]
             x = torch.cat(x_cat_embed, 1)
         else:
-            x = self.cat_embed(X[:, self.cat_idx].long())
+            x = self.cat_embed(x_cat)
 
         if not self.shared_embed and self.embedding_dropout is not None:
             x = self.embedding_dropout(x)
 
         if self.continuous_cols is not None and self.embed_continuous:
-            x_cont = self.cont_norm((X[:, self.cont_idx].float()))
+            x_cont = self.cont_norm(
+                X.index_select(1, self.cont_idx).float()  # type: ignore[arg-type]
+            )
             x_cont_embed = self.cont_embed(x_cont)
             x = torch.cat([x, x_cont_embed], 1)
 
@@ -257,13 +258,22 @@ class TabTransformer(nn.Module):
             x = x.flatten(1)
 
         if self.continuous_cols is not None and not self.embed_continuous:
-            x_cont = self.cont_norm((X[:, self.cont_idx].float()))
+            x_cont = self.cont_norm(
+                X.index_select(1, self.cont_idx).float()  # type: ignore[arg-type]
+            )
             x = torch.cat([x, x_cont], 1)
 
         return self.transformer_mlp(x)
 
     def _set_categ_embeddings(self):
-        self.cat_idx = [self.column_idx[col] for col in self.categorical_cols]
+        self.register_buffer(
+            "cat_idx",
+            torch.tensor(
+                [self.column_idx[col] for col in self.categorical_cols],
+                dtype=torch.long,
+            ),
+            persistent=False,
+        )
         # Categorical: val + 1 because 0 is reserved for padding/unseen cateogories.
         if self.shared_embed:
             self.cat_embed = nn.ModuleDict(
@@ -293,7 +303,14 @@ class TabTransformer(nn.Module):
 
     def _set_cont_cols(self):
         if self.continuous_cols is not None:
-            self.cont_idx = [self.column_idx[col] for col in self.continuous_cols]
+            self.register_buffer(
+                "cont_idx",
+                torch.tensor(
+                    [self.column_idx[col] for col in self.continuous_cols],
+                    dtype=torch.long,
+                ),
+                persistent=False,
+            )
             if self.cont_norm_layer == "layernorm":
                 self.cont_norm: NormLayers = nn.LayerNorm(len(self.continuous_cols))
             elif self.cont_norm_layer == "batchnorm":
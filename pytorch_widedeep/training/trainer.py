@@ -23,6 +23,7 @@ from pytorch_widedeep.callbacks import (
 )
 from pytorch_widedeep.dataloaders import DataLoaderDefault
 from pytorch_widedeep.initializers import Initializer, MultipleInitializer
+from pytorch_widedeep.models.tab_mlp import TabMlp
 from pytorch_widedeep.training._finetune import FineTune
 from pytorch_widedeep.training._wd_dataset import WideDeepDataset
 from pytorch_widedeep.training.trainer_utils import (
@@ -783,9 +784,14 @@ class Trainer:
 
             trainer.get_embeddings(col_name="education", cat_encoding_dict=encoding_dict)
         """
-        for n, p in self.model.named_parameters():
-            if "embed_layers" in n and col_name in n:
-                embed_mtx = p.cpu().data.numpy()
+        for m in self.model.deeptabular.modules():
+            if isinstance(m, TabMlp):
+                embed_mtx = m.embed_matrix(col_name).cpu().data.numpy()
+                break
+        else:
+            for n, p in self.model.named_parameters():
+                if "embed_layers" in n and col_name in n:
+                    embed_mtx = p.cpu().data.numpy()
         encoding_dict = cat_encoding_dict[col_name]
         inv_encoding_dict = {v: k for k, v in encoding_dict.items()}
         cat_embed_dict = {}
@@ -14,8 +14,13 @@ path = os.path.split(full_path)[0]
 df = pd.DataFrame({"galaxies": ["galaxy1.png", "galaxy2.png"]})
 img_col = "galaxies"
 imd_dir = os.path.join(path, "images")
-processor = ImagePreprocessor(img_col=img_col, img_path=imd_dir)
-X_imgs = processor.fit_transform(df)
+
+
+@pytest.fixture(scope="module")
+def X_imgs():
+    processor = ImagePreprocessor(img_col=img_col, img_path=imd_dir)
+    return processor, processor.fit_transform(df)
+
 
 ###############################################################################
 # test on the 2 preprocessors directly
@@ -41,7 +46,8 @@ def test_aap_ssp():
 ###############################################################################
 
 
-def test_sizes():
+def test_sizes(X_imgs):
+    processor, X_imgs = X_imgs
     img_width = X_imgs.shape[1]
     img_height = X_imgs.shape[2]
     assert np.all((img_width == processor.width, img_height == processor.height))
@@ -52,7 +58,8 @@ def test_sizes():
 ###############################################################################
 
 
-def test_notimplementederror():
+def test_notimplementederror(X_imgs):
+    processor, X_imgs = X_imgs
     with pytest.raises(NotImplementedError):
         org_df = processor.inverse_transform(X_imgs)  # noqa: F841
 
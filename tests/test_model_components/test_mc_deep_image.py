@@ -4,7 +4,11 @@ import pytest
 
 from pytorch_widedeep.models import DeepImage
 
-X_images = (torch.from_numpy(np.random.rand(10, 3, 224, 224))).float()
+
+@pytest.fixture(scope="module")
+def X_images():
+    rng = np.random.default_rng(1)
+    return torch.from_numpy(rng.random((10, 3, 224, 224), dtype=np.float32))
 
 
 ###############################################################################
@@ -13,7 +17,7 @@ X_images = (torch.from_numpy(np.random.rand(10, 3, 224, 224))).float()
 model1 = DeepImage()
 
 
-def test_deep_image_1():
+def test_deep_image_1(X_images):
     out = model1(X_images)
     assert out.size(0) == 10 and out.size(1) == 512
 
@@ -24,7 +28,7 @@ def test_deep_image_1():
 model2 = DeepImage(pretrained=False)
 
 
-def test_deep_image_custom_backbone():
+def test_deep_image_custom_backbone(X_images):
     out = model2(X_images)
     assert out.size(0) == 10 and out.size(1) == 512
 
@@ -35,7 +39,7 @@ def test_deep_image_custom_backbone():
 model4 = DeepImage(freeze_n=5)
 
 
-def test_deep_image_freeze_int():
+def test_deep_image_freeze_int(X_images):
     out = model4(X_images)
     assert out.size(0) == 10 and out.size(1) == 512
 
@@ -46,7 +50,7 @@ def test_deep_image_freeze_int():
 model5 = DeepImage(resnet_architecture=34)
 
 
-def test_deep_image_resnet_34():
+def test_deep_image_resnet_34(X_images):
     out = model5(X_images)
     assert out.size(0) == 10 and out.size(1) == 512
 
@@ -57,7 +61,7 @@ def test_deep_image_resnet_34():
 model6 = DeepImage(head_hidden_dims=[512, 256, 128], head_dropout=[0.0, 0.5])
 
 
-def test_deep_image_2():
+def test_deep_image_2(X_images):
     out = model6(X_images)
     assert out.size(0) == 10 and out.size(1) == 128
 
@@ -1,3 +1,5 @@
+import math
+import shutil
 import string
 
 import numpy as np
@@ -5,6 +7,7 @@ import torch
 import pytest
 
 from pytorch_widedeep.models import TabMlp
+from pytorch_widedeep.models.tab_mlp import GEGLU, LinearAct
 
 colnames = list(string.ascii_lowercase)[:10]
 embed_cols = [np.random.choice(np.arange(5), 10) for _ in range(5)]
@@ -90,3 +93,377 @@ def test_act_fn_ValueError():
             embed_input=embed_input,
             continuous_cols=continuous_cols,
         )
+
+
+def test_dropout_ValueError():
+    with pytest.raises(ValueError):
+        model4 = TabMlp(  # noqa: F841
+            mlp_hidden_dims=[32, 16],
+            mlp_dropout=[0.5, 0.2, 0.1],
+            column_idx={k: v for v, k in enumerate(colnames)},
+            embed_input=embed_input,
+            continuous_cols=continuous_cols,
+        )
+
+
+###############################################################################
+# Test the fused embeddings match per-column lookups
+###############################################################################
+
+
+def test_embed_matrix():
+    embed_input = [
+        (u, i, j) for u, i, j in zip(colnames[:5], [5, 3, 4, 5, 2], [8, 16, 8, 4, 16])
+    ]
+    model5 = TabMlp(
+        mlp_hidden_dims=[32, 16],
+        column_idx={k: v for v, k in enumerate(colnames[:5])},
+        embed_input=embed_input,
+    ).eval()
+    X = torch.cat([torch.empty(10, 1).random_(0, n + 1) for _, n, _ in embed_input], 1)
+    # the embeddings are passed to the mlp grouped by embedding dim, i.e. in
+    # the order given by cat_idx
+    embed = torch.cat(
+        [
+            model5.embed_matrix(colnames[i])[X[:, i].long()]
+            for i in model5.cat_idx.tolist()
+        ],
+        1,
+    )
+    assert torch.allclose(model5(X), model5.tab_mlp(embed))
+    assert all(
+        model5.embed_matrix(col).size() == (n + 1, d) for col, n, d in embed_input
+    )
+    assert all(not model5.embed_matrix(col)[0].any() for col, _, _ in embed_input)
+
+
+def test_out_of_range_IndexError():
+    model5 = TabMlp(
+        mlp_hidden_dims=[32, 16],
+        column_idx={k: v for v, k in enumerate(colnames)},
+        embed_input=embed_input,
+        continuous_cols=continuous_cols,
+    )
+    X = X_deep.clone()
+    X[0, 0] = 6
+    with pytest.raises(IndexError):
+        model5(X)
+
+
+def test_empty_continuous_cols():
+    # the index buffers must be LongTensors even when built from empty lists
+    model5 = TabMlp(
+        mlp_hidden_dims=[32, 16],
+        column_idx={k: v for v, k in enumerate(colnames)},
+        embed_input=embed_input,
+        continuous_cols=[],
+        cont_norm_layer=None,
+    )
+    assert model5.cont_idx.dtype == torch.long
+    out = model5(X_deep)
+    assert out.size(0) == 10 and out.size(1) == 16
+
+
+###############################################################################
+# Test loading a state dict saved with one embedding table per column
+###############################################################################
+
+
+@pytest.mark.parametrize("mlp_linear_first", [True, False])
+def test_load_legacy_state_dict(mlp_linear_first):
+    embed_input = [
+        (u, i, j) for u, i, j in zip(colnames[:5], [5, 3, 4, 5, 2], [8, 16, 8, 4, 16])
+    ]
+    params = dict(
+        mlp_hidden_dims=[32, 16],
+        mlp_batchnorm=True,
+        mlp_linear_first=mlp_linear_first,
+        column_idx={k: v for v, k in enumerate(colnames)},
+        embed_input=embed_input,
+        continuous_cols=continuous_cols,
+    )
+    model6 = TabMlp(**params).eval()
+
+    # rebuild the state dict with the old layout: one table per column and
+    # the mlp input in embed_input order
+    state_dict = model6.state_dict()
+    for g in range(len(model6.embed_layers)):
+        del state_dict["embed_layers.{}.weight".format(g)]
+    for col, _, _ in embed_input:
+        key = "embed_layers.emb_layer_" + col + ".weight"
+        state_dict[key] = model6.embed_matrix(col)
+    new_order = [embed_input[i] for i in model6.cat_order.tolist()]
+    new_starts = {}
+    start = 0
+    for col, _, dim in new_order:
+        new_starts[col] = start
+        start += dim
+    perm = [
+        j
+        for col, _, d in embed_input
+        for j in range(new_starts[col], new_starts[col] + d)
+    ]
+    perm += list(range(model6.emb_inp_dim, model6.input_dim))
+    prefix = "tab_mlp.mlp.dense_layer_0."
+    if mlp_linear_first:
+        state_dict[prefix + "0.weight"] = state_dict[prefix + "0.weight"][:, perm]
+    else:
+        for param in ["weight", "bias", "running_mean", "running_var"]:
+            state_dict[prefix + "0." + param] = state_dict[prefix + "0." + param][perm]
+        state_dict[prefix + "2.weight"] = state_dict[prefix + "2.weight"][:, perm]
+
+    model7 = TabMlp(**params).eval()
+    model7.load_state_dict(state_dict)
+    X = torch.cat(
+        [torch.empty(10, 1).random_(0, n + 1) for _, n, _ in embed_input]
+        + [X_deep_cont.float()],
+        1,
+    )
+    assert torch.allclose(model6(X), model7(X))
+
+
+###############################################################################
+# Test the scripted mlp
+###############################################################################
+
+
+@pytest.mark.parametrize(
+    "activation",
+    ["relu", "leaky_relu", "gelu"],
+)
+def test_script_mlp(activation):
+    model6 = TabMlp(
+        mlp_hidden_dims=[32, 16],
+        mlp_activation=activation,
+        mlp_batchnorm=True,
+        column_idx={k: v for v, k in enumerate(colnames)},
+        embed_input=embed_input,
+        continuous_cols=continuous_cols,
+    ).eval()
+    out = model6(X_deep)
+    out_scripted = model6.script_mlp()(X_deep)
+    assert isinstance(model6.tab_mlp, torch.jit.ScriptModule)
+    assert torch.allclose(out, out_scripted)
+
+
+###############################################################################
+# Test the fused linear + activation used in inference
+###############################################################################
+
+
+def test_linear_act():
+    lin_act = LinearAct(10, 8)
+    X = torch.rand(10, 10)
+    out = torch.relu(torch.nn.functional.linear(X, lin_act.weight, lin_act.bias))
+    with torch.no_grad():
+        assert torch.allclose(lin_act.eval()(X), out, atol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "activation",
+    ["relu", "gelu"],
+)
+def test_eval_backward(activation):
+    # e.g. gradient attribution or fine-tuning with frozen batchnorm
+    model = TabMlp(
+        mlp_hidden_dims=[32, 16],
+        mlp_activation=activation,
+        column_idx={k: v for v, k in enumerate(colnames)},
+        embed_input=embed_input,
+        continuous_cols=continuous_cols,
+    ).eval()
+    model(X_deep).sum().backward()
+    assert all(p.grad is not None for p in model.tab_mlp.parameters())
+
+
+###############################################################################
+# Test the geglu activation against its definition
+###############################################################################
+
+
+def test_geglu():
+    X = torch.randn(10, 16)
+    a, g = X.chunk(2, dim=-1)
+    # geglu uses the tanh approximation of the gelu
+    out = (
+        a * 0.5 * g * (1 + torch.tanh(math.sqrt(2 / math.pi) * (g + 0.044715 * g**3)))
+    )
+    assert torch.allclose(GEGLU()(X), out, atol=1e-5)
+
+
+###############################################################################
+# Test folding the continuous batchnorm into the mlp
+###############################################################################
+
+
+@pytest.mark.parametrize(
+    "mlp_batchnorm, mlp_linear_first, folded",
+    [(False, False, True), (True, True, True), (True, False, False)],
+)
+def test_fuse_for_inference(mlp_batchnorm, mlp_linear_first, folded):
+    model7 = TabMlp(
+        mlp_hidden_dims=[32, 16],
+        mlp_batchnorm=mlp_batchnorm,
+        mlp_linear_first=mlp_linear_first,
+        column_idx={k: v for v, k in enumerate(colnames)},
+        embed_input=embed_input,
+        continuous_cols=continuous_cols,
+    )
+    # a few forward passes in train mode to move the running stats
+    for _ in range(3):
+        model7(X_deep)
+    model7.eval()
+    out = model7(X_deep)
+    out_fused = model7.fuse_for_inference()(X_deep)
+    assert isinstance(model7.cont_norm, torch.nn.Identity) == folded
+    assert torch.allclose(out, out_fused, atol=1e-5)
+
+
+###############################################################################
+# Test that the in place dropout does not break the backward pass
+###############################################################################
+
+
+@pytest.mark.parametrize(
+    "activation, mlp_batchnorm, mlp_linear_first",
+    [
+        (act, bn, lf)
+        for act in ["relu", "leaky_relu", "gelu"]
+        for bn in [True, False]
+        for lf in [True, False]
+    ],
+)
+def test_dropout_backward(activation, mlp_batchnorm, mlp_linear_first):
+    model8 = TabMlp(
+        mlp_hidden_dims=[32, 16],
+        mlp_activation=activation,
+        mlp_dropout=0.5,
+        mlp_batchnorm=mlp_batchnorm,
+        mlp_batchnorm_last=True,
+        mlp_linear_first=mlp_linear_first,
+        column_idx={k: v for v, k in enumerate(colnames)},
+        embed_input=embed_input,
+        embed_dropout=0.5,
+        continuous_cols=continuous_cols,
+    )
+    model8(X_deep).sum().backward()
+    assert all(p.grad is not None for p in model8.parameters())
+
+
+###############################################################################
+# Test the forward pass with the categorical and continuous cols split
+###############################################################################
+
+
+@pytest.mark.parametrize(
+    "embed_dims, with_cont",
+    [([16] * 5, True), ([16] * 5, False), ([8, 16, 8, 4, 16], True)],
+)
+def test_forward_split(embed_dims, with_cont):
+    embed_input = [(u, i, j) for u, i, j in zip(colnames[:5], [5] * 5, embed_dims)]
+    model9 = TabMlp(
+        mlp_hidden_dims=[32, 16],
+        column_idx={k: v for v, k in enumerate(colnames)},
+        embed_input=embed_input,
+        continuous_cols=continuous_cols if with_cont else None,
+    ).eval()
+    out = model9(X_deep)
+    out_split = model9.forward_split(
+        X_deep_emb.long(), X_deep_cont.float() if with_cont else None
+    )
+    assert torch.allclose(out, out_split)
+
+
+@pytest.mark.parametrize("missing", ["X_cat", "X_cont"])
+def test_forward_split_ValueError(missing):
+    embed_input = [
+        (u, i, j) for u, i, j in zip(colnames[:5], [5] * 5, [8, 16, 8, 4, 16])
+    ]
+    model9 = TabMlp(
+        mlp_hidden_dims=[32, 16],
+        column_idx={k: v for v, k in enumerate(colnames)},
+        embed_input=embed_input,
+        continuous_cols=continuous_cols,
+    )
+    X_cat = None if missing == "X_cat" else X_deep_emb.long()
+    X_cont = None if missing == "X_cont" else X_deep_cont.float()
+    with pytest.raises(ValueError):
+        model9.forward_split(X_cat, X_cont)
+
+
+###############################################################################
+# Test the bfloat16 inference
+###############################################################################
+
+
+@pytest.mark.parametrize(
+    "embed_dims, mlp_batchnorm, with_cont",
+    [
+        ([16] * 5, False, True),
+        ([16] * 5, True, False),
+        ([8, 16, 8, 4, 16], True, True),
+        (None, False, True),
+    ],
+)
+def test_to_bf16_inference(embed_dims, mlp_batchnorm, with_cont):
+    embed_input = (
+        [(u, i, j) for u, i, j in zip(colnames[:5], [5] * 5, embed_dims)]
+        if embed_dims is not None
+        else None
+    )
+    model10 = TabMlp(
+        mlp_hidden_dims=[32, 16],
+        mlp_batchnorm=mlp_batchnorm,
+        column_idx={k: v for v, k in enumerate(colnames)},
+        embed_input=embed_input,
+        continuous_cols=continuous_cols if with_cont else None,
+    ).eval()
+    out = model10(X_deep)
+    out_bf16 = model10.to_bf16_inference()(X_deep)
+    assert out_bf16.dtype == torch.float32
+    assert torch.allclose(out, out_bf16, atol=0.1)
+    # casting the model back must also cast the mlp input
+    out_fp32 = model10.float()(X_deep)
+    assert model10.mlp_dtype == torch.float32
+    assert torch.allclose(out, out_fp32, atol=0.1)
+
+
+###############################################################################
+# Test the compiled forward pass
+###############################################################################
+
+
+# the inductor backend (the 'compile_forward' default) needs a C++ compiler
+# on cpu and takes a few seconds to compile
+@pytest.mark.skipif(not hasattr(torch, "compile"), reason="requires torch >= 2.0")
+@pytest.mark.parametrize(
+    "backend",
+    [
+        "eager",
+        pytest.param(
+            "inductor",
+            marks=pytest.mark.skipif(
+                shutil.which("c++") is None and shutil.which("g++") is None,
+                reason="requires a C++ compiler",
+            ),
+        ),
+    ],
+)
+def test_compile_forward(backend):
+    model11 = TabMlp(
+        mlp_hidden_dims=[32, 16],
+        column_idx={k: v for v, k in enumerate(colnames)},
+        embed_input=embed_input,
+        continuous_cols=continuous_cols,
+    ).eval()
+    out = model11(X_deep)
+    model11.compile_forward(mode=None, backend=backend)
+    assert model11._compiled_forward is not None
+    assert torch.allclose(out, model11(X_deep), atol=1e-5)
+    with torch.no_grad():
+        assert torch.allclose(out, model11(X_deep), atol=1e-5)
+    # forward_split must also run the compiled graph
+    compiled_forward, calls = model11._compiled_forward, []
+    model11._compiled_forward = lambda *x: calls.append(1) or compiled_forward(*x)
+    out_split = model11.forward_split(X_deep_emb.long(), X_deep_cont.float())
+    assert calls and torch.allclose(out, out_split, atol=1e-5)
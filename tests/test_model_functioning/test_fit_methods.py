@@ -16,26 +16,41 @@ from pytorch_widedeep.metrics import R2Score
 from pytorch_widedeep.training import Trainer
 from pytorch_widedeep.dataloaders import DataLoaderImbalanced
 
-# Wide array
-X_wide = np.random.choice(50, (32, 10))
-
-# Deep Array
 colnames = list(string.ascii_lowercase)[:10]
-embed_cols = [np.random.choice(np.arange(5), 32) for _ in range(5)]
 embed_input = [(u, i, j) for u, i, j in zip(colnames[:5], [5] * 5, [16] * 5)]
 embed_input_tt = [(u, i) for u, i in zip(colnames[:5], [5] * 5)]
-cont_cols = [np.random.rand(32) for _ in range(5)]
 column_idx = {k: v for v, k in enumerate(colnames)}
-X_tab = np.vstack(embed_cols + cont_cols).transpose()
 
-# Target
-target_regres = np.random.random(32)
-target_binary = np.random.choice(2, 32)
-target_binary_imbalanced = np.random.choice(2, 32, p=[0.75, 0.25])
-target_multic = np.random.choice(3, 32)
 
-# Test dictionary
-X_test = {"X_wide": X_wide, "X_tab": X_tab}
+# The arrays are built once per module, and only if a test needs them
+@pytest.fixture(scope="module")
+def rng():
+    return np.random.default_rng(1)
+
+
+# Wide array
+@pytest.fixture(scope="module")
+def X_wide(rng):
+    return rng.integers(0, 50, (32, 10))
+
+
+# Deep Array: 5 categorical cols followed by 5 continuous cols
+@pytest.fixture(scope="module")
+def X_tab(rng):
+    X_tab = rng.standard_normal((32, 10))
+    X_tab[:, :5] = rng.integers(0, 5, (32, 5))
+    return X_tab
+
+
+# Targets
+@pytest.fixture(scope="module")
+def targets(rng):
+    return {
+        "regression": rng.random(32),
+        "binary": rng.integers(0, 2, 32),
+        "binary_imbalanced": rng.choice(2, 32, p=[0.75, 0.25]),
+        "multiclass": rng.integers(0, 3, 32),
+    }
 
 
 ##############################################################################
@@ -43,27 +58,27 @@ X_test = {"X_wide": X_wide, "X_tab": X_tab}
 # work well
 ##############################################################################
 @pytest.mark.parametrize(
-    "X_wide, X_tab, target, objective, X_wide_test, X_tab_test, X_test, pred_dim, probs_dim",
+    "objective, with_X_test, pred_dim, probs_dim",
     [
-        (X_wide, X_tab, target_regres, "regression", X_wide, X_tab, None, 1, None),
-        (X_wide, X_tab, target_binary, "binary", X_wide, X_tab, None, 1, 2),
-        (X_wide, X_tab, target_multic, "multiclass", X_wide, X_tab, None, 3, 3),
-        (X_wide, X_tab, target_regres, "regression", None, None, X_test, 1, None),
-        (X_wide, X_tab, target_binary, "binary", None, None, X_test, 1, 2),
-        (X_wide, X_tab, target_multic, "multiclass", None, None, X_test, 3, 3),
+        ("regression", False, 1, None),
+        ("binary", False, 1, 2),
+        ("multiclass", False, 3, 3),
+        ("regression", True, 1, None),
+        ("binary", True, 1, 2),
+        ("multiclass", True, 3, 3),
     ],
 )
 def test_fit_objectives(
     X_wide,
     X_tab,
-    target,
+    targets,
     objective,
-    X_wide_test,
-    X_tab_test,
-    X_test,
+    with_X_test,
     pred_dim,
     probs_dim,
 ):
+    target = targets[objective]
+    X_test = {"X_wide": X_wide, "X_tab": X_tab} if with_X_test else None
     wide = Wide(np.unique(X_wide).shape[0], pred_dim)
     deeptabular = TabMlp(
         mlp_hidden_dims=[32, 16],
@@ -86,7 +101,7 @@ def test_fit_objectives(
 ##############################################################################
 # Simply Test that runs with the deephead parameter
 ##############################################################################
-def test_fit_with_deephead():
+def test_fit_with_deephead(X_wide, X_tab, targets):
     wide = Wide(np.unique(X_wide).shape[0], 1)
     deeptabular = TabMlp(
         mlp_hidden_dims=[32, 16],
@@ -97,7 +112,8 @@ def test_fit_with_deephead():
     deephead = nn.Sequential(nn.Linear(16, 8), nn.Linear(8, 4))
     model = WideDeep(wide=wide, deeptabular=deeptabular, pred_dim=1, deephead=deephead)
     trainer = Trainer(model, objective="binary", verbose=0)
-    trainer.fit(X_wide=X_wide, X_tab=X_tab, target=target_binary, batch_size=16)
+    trainer.fit(X_wide=X_wide, X_tab=X_tab, target=targets["binary"], batch_size=16)
+    X_test = {"X_wide": X_wide, "X_tab": X_tab}
     preds = trainer.predict(X_wide=X_wide, X_tab=X_tab, X_test=X_test)
     probs = trainer.predict_proba(X_wide=X_wide, X_tab=X_tab, X_test=X_test)
     assert preds.shape[0] == 32, probs.shape[1] == 2
@@ -109,27 +125,27 @@ def test_fit_with_deephead():
 
 
 @pytest.mark.parametrize(
-    "X_wide, X_tab, target, objective, X_wide_test, X_tab_test, X_test, pred_dim, probs_dim",
+    "objective, with_X_test, pred_dim, probs_dim",
     [
-        (X_wide, X_tab, target_regres, "regression", X_wide, X_tab, None, 1, None),
-        (X_wide, X_tab, target_binary, "binary", X_wide, X_tab, None, 1, 2),
-        (X_wide, X_tab, target_multic, "multiclass", X_wide, X_tab, None, 3, 3),
-        (X_wide, X_tab, target_regres, "regression", None, None, X_test, 1, None),
-        (X_wide, X_tab, target_binary, "binary", None, None, X_test, 1, 2),
-        (X_wide, X_tab, target_multic, "multiclass", None, None, X_test, 3, 3),
+        ("regression", False, 1, None),
+        ("binary", False, 1, 2),
+        ("multiclass", False, 3, 3),
+        ("regression", True, 1, None),
+        ("binary", True, 1, 2),
+        ("multiclass", True, 3, 3),
     ],
 )
 def test_fit_objectives_tab_transformer(
     X_wide,
     X_tab,
-    target,
+    targets,
     objective,
-    X_wide_test,
-    X_tab_test,
-    X_test,
+    with_X_test,
     pred_dim,
     probs_dim,
 ):
+    target = targets[objective]
+    X_test = {"X_wide": X_wide, "X_tab": X_tab} if with_X_test else None
     wide = Wide(np.unique(X_wide).shape[0], pred_dim)
     tab_transformer = TabTransformer(
         column_idx={k: v for v, k in enumerate(colnames)},
@@ -153,27 +169,27 @@ def test_fit_objectives_tab_transformer(
 
 
 @pytest.mark.parametrize(
-    "X_wide, X_tab, target, objective, X_wide_test, X_tab_test, X_test, pred_dim, probs_dim",
+    "objective, with_X_test, pred_dim, probs_dim",
     [
-        (X_wide, X_tab, target_regres, "regression", X_wide, X_tab, None, 1, None),
-        (X_wide, X_tab, target_binary, "binary", X_wide, X_tab, None, 1, 2),
-        (X_wide, X_tab, target_multic, "multiclass", X_wide, X_tab, None, 3, 3),
-        (X_wide, X_tab, target_regres, "regression", None, None, X_test, 1, None),
-        (X_wide, X_tab, target_binary, "binary", None, None, X_test, 1, 2),
-        (X_wide, X_tab, target_multic, "multiclass", None, None, X_test, 3, 3),
+        ("regression", False, 1, None),
+        ("binary", False, 1, 2),
+        ("multiclass", False, 3, 3),
+        ("regression", True, 1, None),
+        ("binary", True, 1, 2),
+        ("multiclass", True, 3, 3),
     ],
 )
 def test_fit_objectives_tabnet(
     X_wide,
     X_tab,
-    target,
+    targets,
     objective,
-    X_wide_test,
-    X_tab_test,
-    X_test,
+    with_X_test,
     pred_dim,
     probs_dim,
 ):
+    target = targets[objective]
+    X_test = {"X_wide": X_wide, "X_tab": X_tab} if with_X_test else None
     warnings.filterwarnings("ignore")
     wide = Wide(np.unique(X_wide).shape[0], pred_dim)
     tab_transformer = TabNet(
@@ -197,7 +213,7 @@ def test_fit_objectives_tabnet(
 ##############################################################################
 
 
-def test_fit_with_regression_and_metric():
+def test_fit_with_regression_and_metric(X_wide, X_tab, targets):
     wide = Wide(np.unique(X_wide).shape[0], 1)
     deeptabular = TabMlp(
         mlp_hidden_dims=[32, 16],
@@ -208,7 +224,7 @@ def test_fit_with_regression_and_metric():
     )
     model = WideDeep(wide=wide, deeptabular=deeptabular, pred_dim=1)
     trainer = Trainer(model, objective="regression", metrics=[R2Score], verbose=0)
-    trainer.fit(X_wide=X_wide, X_tab=X_tab, target=target_regres, batch_size=16)
+    trainer.fit(X_wide=X_wide, X_tab=X_tab, target=targets["regression"], batch_size=16)
     assert "train_r2" in trainer.history.keys()
 
 
@@ -217,7 +233,7 @@ def test_fit_with_regression_and_metric():
 ##############################################################################
 
 
-def test_aliases():
+def test_aliases(X_wide, X_tab, targets):
     wide = Wide(np.unique(X_wide).shape[0], 1)
     deeptabular = TabMlp(
         mlp_hidden_dims=[32, 16],
@@ -229,7 +245,11 @@ def test_aliases():
     model = WideDeep(wide=wide, deeptabular=deeptabular, pred_dim=1)
     trainer = Trainer(model, loss="regression", verbose=0)
     trainer.fit(
-        X_wide=X_wide, X_tab=X_tab, target=target_regres, batch_size=16, warmup=True
+        X_wide=X_wide,
+        X_tab=X_tab,
+        target=targets["regression"],
+        batch_size=16,
+        warmup=True,
     )
     assert (
         "train_loss" in trainer.history.keys()
@@ -243,7 +263,7 @@ def test_aliases():
 ##############################################################################
 
 
-def test_custom_dataloader():
+def test_custom_dataloader(X_wide, X_tab, targets):
     wide = Wide(np.unique(X_wide).shape[0], 1)
     deeptabular = TabMlp(
         mlp_hidden_dims=[32, 16],
@@ -257,7 +277,7 @@ def test_custom_dataloader():
     trainer.fit(
         X_wide=X_wide,
         X_tab=X_tab,
-        target=target_binary_imbalanced,
+        target=targets["binary_imbalanced"],
         batch_size=16,
         custom_dataloader=DataLoaderImbalanced,
     )